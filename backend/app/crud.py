@@ -73,3 +73,16 @@ def add_comment(db: Session, section_id: int, user_id: int, text: str):
     db.commit()
     db.refresh(c)
     return c
+
+
+def add_sections_with_content(db: Session, project_id: int, sections: List[tuple], is_slide: bool = False):
+    """Insert (title, content) pairs as sections in a single transaction."""
+    created = []
+    for idx, (title, content) in enumerate(sections):
+        sec = models.Section(project_id=project_id, title=title, content=content, position=idx, is_slide=is_slide)
+        db.add(sec)
+        created.append(sec)
+    db.commit()
+    for sec in created:
+        db.refresh(sec)
+    return created
@@ -95,9 +95,12 @@ def _call_gemini(prompt: str, context: str | None = None) -> str:
         return f"[Gemini call error: {e}]"
 
 
-def _call_openrouter(prompt: str, context: str | None = None) -> str:
-    """Call OpenRouter chat completions. Expects OPENROUTER_API_KEY and OPENROUTER_MODEL set."""
-    import requests, json
+class LLMError(Exception):
+    """Raised by the streaming helpers when the provider call fails."""
+
+
+def _openrouter_request(prompt: str, context: str | None = None, stream: bool = False):
+    """Build the (endpoint, headers, body) of an OpenRouter chat completion request."""
     # allow overriding the endpoint (useful if you want a proxy or different base)
     endpoint = OPENROUTER_ENDPOINT or 'https://openrouter.ai/api/v1/chat/completions'
     headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {OPENROUTER_API_KEY}'}
@@ -106,6 +109,15 @@ def _call_openrouter(prompt: str, context: str | None = None) -> str:
         {"role": "user", "content": f"{prompt}\n\nContext:\n{context or ''}\n\nPlease produce a polished section of approximately 150-300 words, suitable for business documents."}
     ]
     body = {"model": OPENROUTER_MODEL, "messages": messages, "temperature": 0.2, "max_tokens": 600}
+    if stream:
+        body["stream"] = True
+    return endpoint, headers, body
+
+
+def _call_openrouter(prompt: str, context: str | None = None) -> str:
+    """Call OpenRouter chat completions. Expects OPENROUTER_API_KEY and OPENROUTER_MODEL set."""
+    import requests, json
+    endpoint, headers, body = _openrouter_request(prompt, context)
     try:
         resp = requests.post(endpoint, headers=headers, data=json.dumps(body), timeout=30)
         if resp.status_code != 200:
@@ -153,3 +165,64 @@ def generate_for_section(prompt: str, context: str | None = None) -> str:
         base += f"(context: {context})\n"
     base += "\nThis is placeholder generated content. To enable real LLM outputs, set the appropriate API key in your `.env` and set LLM_PROVIDER=openai or gemini."
     return base
+
+
+def _stream_openrouter(prompt: str, context: str | None = None):
+    """Stream an OpenRouter chat completion, yielding text deltas as they arrive."""
+    import requests, json
+    endpoint, headers, body = _openrouter_request(prompt, context, stream=True)
+    try:
+        with requests.post(endpoint, headers=headers, data=json.dumps(body), timeout=30, stream=True) as resp:
+            if resp.status_code != 200:
+                raise LLMError(f"OpenRouter error {resp.status_code}: {resp.text}")
+            for raw in resp.iter_lines(decode_unicode=True):
+                # server-sent events: 'data: {...}' lines, terminated by 'data: [DONE]'
+                if not raw or not raw.startswith('data:'):
+                    continue
+                payload = raw[len('data:'):].strip()
+                if payload == '[DONE]':
+                    break
+                try:
+                    chunk = json.loads(payload)
+                except ValueError:
+                    continue
+                choices = chunk.get('choices') or []
+                if choices:
+                    delta = (choices[0].get('delta') or {}).get('content')
+                    if delta:
+                        yield delta
+    except LLMError:
+        raise
+    except Exception as e:
+        raise LLMError(f"OpenRouter call error: {e}")
+
+
+# prefixes of the error strings generate_for_section returns instead of raising
+_ERROR_PREFIXES = ('[LLM error', '[LLM returned no choices]', '[Gemini error', '[Gemini call error', '[OpenRouter error', '[OpenRouter call error')
+
+
+def is_error_text(text: str) -> bool:
+    return text.startswith(_ERROR_PREFIXES)
+
+
+def stream_lines(prompt: str, context: str | None = None):
+    """
+    Yield the LLM response one line at a time, as soon as each line is complete.
+    Only OpenRouter is streamed token-by-token; other providers produce the full
+    response first and then yield its lines. Raises LLMError if the call fails.
+    """
+    if LLM_PROVIDER == 'openrouter' and OPENROUTER_API_KEY:
+        buf = ''
+        for delta in _stream_openrouter(prompt, context):
+            buf += delta
+            while '\n' in buf:
+                line, buf = buf.split('\n', 1)
+                yield line
+        if buf:
+            yield buf
+        return
+    text = generate_for_section(prompt, context)
+    if is_error_text(text):
+        raise LLMError(text.splitlines()[0].strip('[]'))
+    for line in text.splitlines():
+        yield line
@@ -1,11 +1,15 @@
 from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from . import models, schemas, crud, auth, llm_client, exporter
+from sqlalchemy.exc import SQLAlchemyError
+from . import models, schemas, crud, auth, llm_client, exporter, pipeline
 from .database import engine, Base, get_db
 from fastapi import status
 from dotenv import load_dotenv
 import os
+import re
+import json
 
 load_dotenv()
 
@@ -22,6 +26,19 @@ app.add_middleware(
 )
 
 
+def _section_prompt(proj: models.Project, title: str) -> str:
+    return f"Write content for section titled '{title}' about: {proj.prompt or ''}"
+
+
+def _outline_prompt(proj: models.Project, count: int) -> str:
+    return f"Suggest {count} concise section or slide titles (one per line) for a document about: {proj.prompt or proj.title}. Return titles only."
+
+
+def _parse_outline_title(line: str) -> str:
+    # remove leading numbering or bullets
+    return re.sub(r'^\s*\d+\.|^\s*[-*\u2022]\s*', '', line.strip()).strip()
+
+
 def get_current_user(token: str = Depends(auth.oauth2_scheme), db: Session = Depends(get_db)):
     payload = auth.decode_token(token)
     user = db.query(models.User).filter(models.User.id == payload.get('sub')).first()
@@ -61,7 +78,7 @@ def list_projects(db: Session = Depends(get_db), current_user: models.User = Dep
     return projects
 
 
-@app.get('/projects/{project_id}')
+@app.get('/projects/{project_id}', response_model=schemas.ProjectOut)
 def get_project(project_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     proj = crud.get_project(db, project_id, current_user.id)
     if not proj:
@@ -76,7 +93,7 @@ def generate_content(project_id: int, db: Session = Depends(get_db), current_use
         raise HTTPException(status_code=404, detail='Project not found')
     # Generate for each section sequentially
     for sec in proj.sections:
-        prompt = f"Write content for section titled '{sec.title}' about: {proj.prompt or ''}"
+        prompt = _section_prompt(proj, sec.title)
         text = llm_client.generate_for_section(prompt)
         crud.update_section_content(db, sec.id, text)
     return {'status': 'generated'}
@@ -123,15 +140,12 @@ def suggest_outline(project_id: int, count: int = 5, db: Session = Depends(get_d
     if not proj:
         raise HTTPException(status_code=404, detail='Project not found')
     # Ask LLM to suggest section or slide titles
-    prompt = f"Suggest {count} concise section or slide titles (one per line) for a document about: {proj.prompt or proj.title}. Return titles only."
+    prompt = _outline_prompt(proj, count)
     text = llm_client.generate_for_section(prompt)
     # parse lines and strip numbering/bullets
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
     titles = []
-    for l in lines:
-        # remove leading numbering or bullets
-        import re
-        t = re.sub(r'^\s*\d+\.|^\s*[-*\u2022]\s*', '', l).strip()
+    for l in text.splitlines():
+        t = _parse_outline_title(l)
         if t:
             titles.append(t)
     # fallback: if parsing failed, use the whole text as one title
@@ -151,3 +165,97 @@ def apply_outline(project_id: int, payload: dict, db: Session = Depends(get_db),
         sec = crud.add_section(db, proj.id, title=t, position=idx, is_slide=(proj.doc_type == 'pptx'))
         created.append({'id': sec.id, 'title': sec.title})
     return {'created': created}
+
+
+@app.post('/projects/{project_id}/pipeline')
+def start_pipeline(project_id: int, count: int = 5, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    """
+    Opt-in speculative flow: stream outline titles as newline-delimited JSON and start
+    drafting each section in the background as soon as its title is parsed.
+    Nothing is added to the project until the pipeline is accepted.
+    """
+    proj = crud.get_project(db, project_id, current_user.id)
+    if not proj:
+        raise HTTPException(status_code=404, detail='Project not found')
+    if count < 1 or count > pipeline.MAX_OUTLINE_COUNT:
+        raise HTTPException(status_code=400, detail=f'count must be between 1 and {pipeline.MAX_OUTLINE_COUNT}')
+    pipe_id = pipeline.create(db, proj.id, current_user.id).id
+    # reload after the commit so the stream below reads proj without touching the session
+    db.refresh(proj)
+    outline_prompt = _outline_prompt(proj, count)
+
+    def events():
+        finished = False
+        try:
+            yield json.dumps({'pipeline_id': pipe_id}) + '\n'
+            index = 0
+            lines = []
+            for line in llm_client.stream_lines(outline_prompt):
+                lines.append(line)
+                t = _parse_outline_title(line)
+                # skip a preamble such as "Here are 5 titles:" so it does not take a slot
+                if not t or (index == 0 and line.strip().endswith(':')):
+                    continue
+                # stops early if the pipeline was accepted, cancelled or expired meanwhile
+                if not pipeline.start_draft(pipe_id, t, index, _section_prompt(proj, t)):
+                    break
+                yield json.dumps({'index': index, 'title': t}) + '\n'
+                index += 1
+                if index >= count:
+                    break
+            # fallback: if parsing failed, use the whole text as one title
+            if index == 0:
+                t = '\n'.join(lines).strip()
+                if not t:
+                    yield json.dumps({'error': 'LLM returned no outline titles'}) + '\n'
+                    return
+                if pipeline.start_draft(pipe_id, t, 0, _section_prompt(proj, t)):
+                    yield json.dumps({'index': 0, 'title': t}) + '\n'
+            yield json.dumps({'done': True}) + '\n'
+            finished = True
+        except llm_client.LLMError as e:
+            yield json.dumps({'error': str(e)}) + '\n'
+        except SQLAlchemyError:
+            yield json.dumps({'error': 'Could not save the outline drafts'}) + '\n'
+        finally:
+            # errors and client disconnects leave nothing to accept
+            if not finished:
+                pipeline.discard(pipe_id)
+
+    return StreamingResponse(events(), media_type='application/x-ndjson')
+
+
+@app.post('/projects/{project_id}/pipeline/{pipeline_id}/accept')
+def accept_pipeline(project_id: int, pipeline_id: str, payload: schemas.PipelineAccept, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    proj = crud.get_project(db, project_id, current_user.id)
+    if not proj:
+        raise HTTPException(status_code=404, detail='Project not found')
+    pipe = pipeline.get(db, pipeline_id, proj.id, current_user.id)
+    if not pipe:
+        raise HTTPException(status_code=404, detail='Pipeline not found')
+    titles = payload.titles
+    # reuse drafts for accepted titles; edited or added titles are generated now
+    try:
+        contents = pipeline.collect(db, pipe, titles, lambda t: _section_prompt(proj, t))
+    except pipeline.PipelineTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except pipeline.PipelineError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    # drafts for rejected titles are deleted with the pipeline, in the same commit as the sections
+    try:
+        db.delete(pipe)
+        created = crud.add_sections_with_content(db, proj.id, list(zip(titles, contents)), is_slide=(proj.doc_type == 'pptx'))
+    except SQLAlchemyError:
+        # e.g. the pipeline was cancelled or accepted concurrently on another worker
+        db.rollback()
+        raise HTTPException(status_code=409, detail='Pipeline was closed while accepting')
+    return {'created': [{'id': sec.id, 'title': sec.title} for sec in created]}
+
+
+@app.delete('/projects/{project_id}/pipeline/{pipeline_id}')
+def cancel_pipeline(project_id: int, pipeline_id: str, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    pipe = pipeline.get(db, pipeline_id, project_id, current_user.id)
+    if not pipe:
+        raise HTTPException(status_code=404, detail='Pipeline not found')
+    pipeline.close(db, pipe)
+    return {'status': 'cancelled'}
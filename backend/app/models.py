@@ -57,3 +57,24 @@ class Comment(Base):
     text = Column(Text)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     section = relationship('Section', back_populates='comments')
+
+
+class Pipeline(Base):
+    __tablename__ = 'pipelines'
+    id = Column(String, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey('projects.id'))
+    user_id = Column(Integer, ForeignKey('users.id'))
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    drafts = relationship('PipelineDraft', back_populates='pipeline', order_by='PipelineDraft.position', cascade='all, delete-orphan')
+
+
+class PipelineDraft(Base):
+    __tablename__ = 'pipeline_drafts'
+    id = Column(Integer, primary_key=True, index=True)
+    pipeline_id = Column(String, ForeignKey('pipelines.id', ondelete='CASCADE'), index=True)
+    title = Column(String, nullable=False)
+    position = Column(Integer, default=0)
+    status = Column(String, default='pending')  # pending, done or failed
+    content = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    pipeline = relationship('Pipeline', back_populates='drafts')
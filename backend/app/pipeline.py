@@ -0,0 +1,190 @@
+import datetime
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from . import models, llm_client
+from .database import SessionLocal
+
+# Section drafts are generated in the background while the outline is still
+# streaming, so the document is mostly written by the time the user accepts.
+# Pipelines and drafts are stored in the database so that accept and cancel work
+# on any worker; only the draft threads belong to the worker that streamed.
+PIPELINE_TTL_SECONDS = int(os.getenv('PIPELINE_TTL_SECONDS', '900'))
+ACCEPT_TIMEOUT_SECONDS = int(os.getenv('PIPELINE_ACCEPT_TIMEOUT_SECONDS', '90'))
+MAX_OUTLINE_COUNT = 20
+
+_draft_executor = ThreadPoolExecutor(max_workers=8)
+# accept-time generation gets its own pool so it never queues behind other users' drafts
+_accept_executor = ThreadPoolExecutor(max_workers=4)
+
+
+class PipelineError(Exception):
+    """A section could not be generated for accept."""
+
+
+class PipelineTimeout(PipelineError):
+    """Sections were not ready within ACCEPT_TIMEOUT_SECONDS."""
+
+
+def _cutoff():
+    return datetime.datetime.utcnow() - datetime.timedelta(seconds=PIPELINE_TTL_SECONDS)
+
+
+def _is_open(db: Session, pipeline_id: str) -> bool:
+    return db.query(models.Pipeline.id).filter(models.Pipeline.id == pipeline_id, models.Pipeline.created_at >= _cutoff()).first() is not None
+
+
+def sweep_expired(db: Session):
+    """Delete pipelines older than PIPELINE_TTL_SECONDS together with their drafts."""
+    expired = db.query(models.Pipeline).filter(models.Pipeline.created_at < _cutoff()).all()
+    for pipe in expired:
+        db.delete(pipe)
+    # drafts recorded just as their pipeline was closed on another worker
+    # (only possible where foreign keys are not enforced, e.g. default SQLite)
+    orphans = db.query(models.PipelineDraft).filter(~models.PipelineDraft.pipeline_id.in_(db.query(models.Pipeline.id)))
+    orphans.delete(synchronize_session=False)
+    # always end the transaction: on SQLite an open one holds the write lock
+    db.commit()
+
+
+def create(db: Session, project_id: int, user_id: int):
+    sweep_expired(db)
+    pipe = models.Pipeline(id=uuid.uuid4().hex, project_id=project_id, user_id=user_id)
+    db.add(pipe)
+    db.commit()
+    db.refresh(pipe)
+    return pipe
+
+
+def get(db: Session, pipeline_id: str, project_id: int, user_id: int):
+    sweep_expired(db)
+    return db.query(models.Pipeline).filter(models.Pipeline.id == pipeline_id, models.Pipeline.project_id == project_id, models.Pipeline.user_id == user_id).first()
+
+
+def close(db: Session, pipe: models.Pipeline):
+    db.delete(pipe)
+    db.commit()
+
+
+def discard(pipeline_id: str):
+    """Close a pipeline by id from outside a request, e.g. when its stream is abandoned."""
+    db = SessionLocal()
+    try:
+        pipe = db.get(models.Pipeline, pipeline_id)
+        if pipe:
+            close(db, pipe)
+    except SQLAlchemyError:
+        # best effort; sweep_expired removes it once the TTL has passed
+        db.rollback()
+    finally:
+        db.close()
+
+
+def start_draft(pipeline_id: str, title: str, position: int, prompt: str) -> bool:
+    """Record a draft and generate it in the background. Returns False once the pipeline is gone."""
+    db = SessionLocal()
+    try:
+        # the outline may still be streaming after the user accepted or cancelled
+        if not _is_open(db, pipeline_id):
+            return False
+        draft = models.PipelineDraft(pipeline_id=pipeline_id, title=title, position=position)
+        db.add(draft)
+        try:
+            db.commit()
+        except IntegrityError:
+            # the pipeline was deleted on another worker after the check above
+            db.rollback()
+            return False
+        draft_id = draft.id
+    finally:
+        db.close()
+    _draft_executor.submit(_run_draft, draft_id, pipeline_id, prompt)
+    return True
+
+
+def _run_draft(draft_id: int, pipeline_id: str, prompt: str):
+    db = SessionLocal()
+    try:
+        # skip queued drafts whose pipeline was accepted, cancelled or expired
+        if not _is_open(db, pipeline_id):
+            return
+    finally:
+        db.close()
+    try:
+        text = llm_client.generate_for_section(prompt)
+        values = {'status': 'failed' if llm_client.is_error_text(text) else 'done', 'content': text}
+    except Exception as e:
+        values = {'status': 'failed', 'content': str(e)}
+    db = SessionLocal()
+    try:
+        # a no-op if the draft was discarded meanwhile
+        db.query(models.PipelineDraft).filter(models.PipelineDraft.id == draft_id).update(values, synchronize_session=False)
+        db.commit()
+    except SQLAlchemyError:
+        db.rollback()
+        # a draft left pending would keep accept waiting until it times out
+        try:
+            db.query(models.PipelineDraft).filter(models.PipelineDraft.id == draft_id).update({'status': 'failed'}, synchronize_session=False)
+            db.commit()
+        except SQLAlchemyError:
+            db.rollback()
+    finally:
+        db.close()
+
+
+def collect(db: Session, pipe: models.Pipeline, titles: list, prompt_for) -> list:
+    """
+    Return the content for each accepted title, in order. Finished drafts are reused;
+    titles without a usable draft are generated now. Raises PipelineError on failure.
+    """
+    deadline = time.monotonic() + ACCEPT_TIMEOUT_SECONDS
+    # past this point drafts still pending are regenerated rather than waited on
+    regenerate_at = deadline - ACCEPT_TIMEOUT_SECONDS / 3
+    # a draft pending this long was most likely lost with its worker
+    stale_before = datetime.datetime.utcnow() - datetime.timedelta(seconds=ACCEPT_TIMEOUT_SECONDS)
+    unused = list(pipe.drafts)
+    draft_ids = []
+    for t in titles:
+        draft = next((d for d in unused if d.title == t), None)
+        if draft:
+            unused.remove(draft)
+        draft_ids.append(draft.id if draft else None)
+    contents = [None] * len(titles)
+    futures = {}
+    try:
+        while True:
+            waiting = False
+            db.expire_all()
+            for idx, draft_id in enumerate(draft_ids):
+                if contents[idx] is not None or idx in futures:
+                    continue
+                draft = db.get(models.PipelineDraft, draft_id) if draft_id else None
+                if draft and draft.status == 'done':
+                    contents[idx] = draft.content
+                elif draft and draft.status == 'pending' and draft.created_at >= stale_before and time.monotonic() < regenerate_at:
+                    waiting = True
+                else:
+                    futures[idx] = _accept_executor.submit(llm_client.generate_for_section, prompt_for(titles[idx]))
+            if not waiting:
+                break
+            # hold no transaction while waiting, so draft threads can write their results
+            db.rollback()
+            time.sleep(0.5)
+        for idx, fut in futures.items():
+            try:
+                text = fut.result(timeout=max(0, deadline - time.monotonic()))
+            except TimeoutError:
+                raise PipelineTimeout('Timed out generating sections')
+            except Exception as e:
+                raise PipelineError(f'Section generation failed: {e}')
+            if llm_client.is_error_text(text):
+                raise PipelineError(text.splitlines()[0].strip('[]'))
+            contents[idx] = text
+    except PipelineError:
+        for fut in futures.values():
+            fut.cancel()
+        raise
+    return contents
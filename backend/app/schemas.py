@@ -57,3 +57,7 @@ class RefinementCreate(BaseModel):
 class CommentCreate(BaseModel):
     section_id: int
     text: str
+
+
+class PipelineAccept(BaseModel):
+    titles: List[str]
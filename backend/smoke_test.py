@@ -1,4 +1,5 @@
-import requests, time, sys
+import requests, time, sys, json
+from app import llm_client
 
 BASE = 'http://localhost:8000'
 
@@ -57,5 +58,53 @@ def main():
         f.write(r.content)
     p('Export saved to ' + fname)
 
+    p('Creating project for speculative pipeline')
+    proj_body['title'] = 'Smoke Test Pipeline Project'
+    r = requests.post(BASE + '/projects', json=proj_body, headers=headers)
+    if r.status_code != 200:
+        print('Create project failed', r.status_code, r.text); sys.exit(1)
+    pid2 = r.json()['id']
+
+    p('Streaming pipeline outline')
+    r = requests.post(BASE + f'/projects/{pid2}/pipeline?count=3', headers=headers, stream=True)
+    if r.status_code != 200:
+        print('Pipeline failed', r.status_code, r.text); sys.exit(1)
+    pipeline_id, titles = None, []
+    for line in r.iter_lines(decode_unicode=True):
+        if not line:
+            continue
+        event = json.loads(line)
+        if 'error' in event:
+            print('Pipeline error', event['error']); sys.exit(1)
+        if 'pipeline_id' in event:
+            pipeline_id = event['pipeline_id']
+        elif 'title' in event:
+            titles.append(event['title'])
+    p('Streamed titles: ' + str(titles))
+    if not pipeline_id or not titles:
+        print('Pipeline returned no titles'); sys.exit(1)
+
+    # keep all but the last title and edit that one, so it is generated at accept time
+    accepted = titles[:-1] + [titles[-1] + ' (edited)']
+    p('Accepting pipeline')
+    r = requests.post(BASE + f'/projects/{pid2}/pipeline/{pipeline_id}/accept', json={'titles': accepted}, headers=headers)
+    if r.status_code != 200:
+        print('Accept failed', r.status_code, r.text); sys.exit(1)
+
+    r = requests.get(BASE + f'/projects/{pid2}', headers=headers)
+    sections = r.json().get('sections', [])
+    saved = [(s['title'], s['position']) for s in sections]
+    if saved != [(t, idx) for idx, t in enumerate(accepted)]:
+        print('Unexpected sections', saved); sys.exit(1)
+    for s in sections:
+        if not s.get('content') or llm_client.is_error_text(s['content']):
+            print('Missing content for', s['title'], repr(s.get('content'))); sys.exit(1)
+    p('Pipeline accepted with sections: ' + str([t for t, _ in saved]))
+
+    r = requests.post(BASE + f'/projects/{pid2}/pipeline/{pipeline_id}/accept', json={'titles': accepted}, headers=headers)
+    if r.status_code != 404:
+        print('Accepted pipeline still open', r.status_code, r.text); sys.exit(1)
+    p('Pipeline closed after accept')
+
 if __name__ == '__main__':
     main()